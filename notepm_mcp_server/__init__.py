@@ -2,7 +2,6 @@ import click
 from pathlib import Path
 import logging
 import sys
-from notepm_mcp_server.notepm import serve
 
 
 @click.command()
@@ -12,6 +11,9 @@ def main(repository: Path | None, verbose: bool) -> None:
     """MCP NotePM Server - NotePM functionality for MCP"""
     import asyncio
 
+    # mcpやhttpxの読み込みは重いため、--helpなどでは読み込まないようにサーバー起動時まで遅らせる
+    from notepm_mcp_server.notepm import serve
+
     logging_level = logging.WARN
     if verbose == 1:
         logging_level = logging.INFO
@@ -19,7 +21,15 @@ def main(repository: Path | None, verbose: bool) -> None:
         logging_level = logging.DEBUG
 
     logging.basicConfig(level=logging_level, stream=sys.stderr)
-    asyncio.run(serve())
+
+    # uvloopがインストールされている場合は高速なイベントループを使用する
+    try:
+        import uvloop
+
+        run = uvloop.run
+    except ImportError:
+        run = asyncio.run
+    run(serve())
 
 
 if __name__ == "__main__":
@@ -1,15 +1,43 @@
 from mcp.server import Server
 from mcp.server.stdio import stdio_server
 from mcp.types import Tool, TextContent
-from pydantic import BaseModel
+from pydantic import BaseModel, ConfigDict, Field, field_validator
 import httpx
+import asyncio
+import logging
+import math
 import os
-from typing import Optional
+import random
+import time
+from datetime import timezone
+from email.utils import parsedate_to_datetime
+from urllib.parse import quote
+from typing import NamedTuple, Optional
+from cachetools import LRUCache
 from dotenv import load_dotenv
-import json
-
-# 環境変数の読み込み
-load_dotenv()
+import orjson
+
+logger = logging.getLogger(__name__)
+
+# 一時的なエラーとしてリトライするHTTPステータスコード
+_RETRY_STATUS_CODES = frozenset({429, 502, 503, 504})
+# リトライの最大回数
+_MAX_RETRIES = 3
+# 指数バックオフの基準秒数とジッターの最大秒数
+_RETRY_BACKOFF_BASE = 0.5
+_RETRY_JITTER = 0.25
+# 一回のAPI呼び出しでリトライのために待機する合計秒数の上限
+_RETRY_BUDGET = 12.0
+# X-RateLimit-Resetの値をUNIX時刻とみなす下限 (これより小さい値は秒数として扱う)
+_RATE_LIMIT_RESET_EPOCH_THRESHOLD = 1e9
+# 一括詳細取得で同時に送信するリクエストの最大数
+_BATCH_CONCURRENCY = 16
+# 一括詳細取得で一度に指定できるページコードの最大数
+_BATCH_MAX_PAGES = 50
+# 省略した本文の末尾に付ける文字列
+_TRUNCATION_SUFFIX = "..."
+# 詳細取得結果をキャッシュするページ数の上限
+_PAGE_CACHE_MAXSIZE = 256
 
 
 class NotePMConfig:
@@ -21,19 +49,33 @@ class NotePMConfig:
         team (str): NotePMのチーム名
         api_token (str): NotePM APIのトークン
         api_base (str): APIのベースURL
-        max_body_length (int): 本文の最大文字数
+        auth_header (dict[str, str]): 事前に生成した認証ヘッダー
+        max_body_length (int): 本文の最大文字数 (0以下の場合は省略しない)
+        page_cache_ttl (float): 詳細取得結果をキャッシュする秒数 (0以下の場合はキャッシュしない)
     """
 
     def __init__(self):
+        # 環境変数の読み込み（既に設定されている環境変数は上書きしない）
+        load_dotenv()
+
         self.team = os.getenv("NOTEPM_TEAM")
         self.api_token = os.getenv("NOTEPM_API_TOKEN")
         if not self.team or not self.api_token:
             raise ValueError("環境変数NOTEPM_TEAMとNOTEPM_API_TOKENが必要です")
         self.api_base = f"https://{self.team}.notepm.jp/api/v1/pages"
+        self.auth_header = {"Authorization": f"Bearer {self.api_token}"}
 
-        # 本文の最大文字数を環境変数から取得（デフォルト: 200）
+        # 本文の最大文字数を環境変数から取得（デフォルト: 200、0以下で省略しない）
         self.max_body_length = int(os.getenv("NOTEPM_MAX_BODY_LENGTH", "200"))
 
+        # 詳細取得結果のキャッシュ秒数を環境変数から取得（デフォルト: 60、0以下でキャッシュしない）
+        self.page_cache_ttl = float(os.getenv("NOTEPM_PAGE_CACHE_TTL", "60"))
+
+    @property
+    def truncates_body(self) -> bool:
+        """検索結果の本文を省略するかどうか"""
+        return self.max_body_length > 0
+
 
 class SearchParams(BaseModel):
     """NotePM API検索パラメータモデル
@@ -49,6 +91,8 @@ class SearchParams(BaseModel):
         per_page (int): 1ページあたりの結果数 (デフォルト: 10)
     """
 
+    model_config = ConfigDict(extra="forbid")
+
     q: str
     only_title: int = 0
     include_archived: int = 0
@@ -66,127 +110,393 @@ class NotePMDetailParams(BaseModel):
         page_code (str): ページコード
     """
 
-    page_code: str
+    model_config = ConfigDict(extra="forbid")
 
+    page_code: str = Field(min_length=1)
 
-class NotePMAPIClient:
-    """NotePM APIクライアント
+    @field_validator("page_code")
+    @classmethod
+    def _reject_dot_segment(cls, value: str) -> str:
+        """ページ一覧以外のパスを指さないよう、"."と".."を拒否します"""
+        if value in (".", ".."):
+            raise ValueError("不正なページコードです")
+        return value
 
-    非同期HTTPクライアントを使用してNotePM APIと通信を行います。
-    コンテキストマネージャとして使用することで、リソースの適切な解放を保証します。
+
+class NotePMDetailsBatchParams(BaseModel):
+    """NotePM API一括詳細取得パラメータモデル
+
+    Attributes:
+        page_codes (list[str]): ページコードのリスト (1件以上、最大50件)
     """
 
-    def __init__(self, config: NotePMConfig):
-        """
-        Args:
-            config (NotePMConfig): API設定
-        """
-        self.config = config
-        self._client = httpx.AsyncClient()
+    model_config = ConfigDict(extra="forbid")
 
-    async def __aenter__(self):
-        """非同期コンテキストマネージャのエントリーポイント"""
-        return self
+    page_codes: list[str] = Field(min_length=1, max_length=_BATCH_MAX_PAGES)
 
-    async def __aexit__(self, exc_type, exc_val, exc_tb):
-        """非同期コンテキストマネージャの終了処理
 
-        HTTPクライアントのリソースを適切に解放します。
-        """
-        await self._client.aclose()
+class _CachedPage(NamedTuple):
+    """キャッシュした詳細取得結果
 
-    async def search(self, params: SearchParams) -> str:
-        """NotePMの検索APIを呼び出します
+    Attributes:
+        fetched_at (float): 取得または再検証した時刻 (time.monotonic()の値)
+        etag (Optional[str]): レスポンスのETag
+        content (bytes): レスポンスの本文
+    """
 
-        Args:
-            params (SearchParams): 検索パラメータ
+    fetched_at: float
+    etag: Optional[str]
+    content: bytes
+
+
+# ページコードをキーとした詳細取得結果のキャッシュ
+# キャッシュの読み書きはawaitを挟まずに行うため、イベントループ上でロックは不要
+_page_detail_cache: LRUCache[str, _CachedPage] = LRUCache(maxsize=_PAGE_CACHE_MAXSIZE)
+
+
+# ツールの入力スキーマ
+# Pydanticが生成するスキーマより小さく、生成処理も不要なため、パラメータモデルに合わせて直接定義する
+_SEARCH_SCHEMA = {
+    "type": "object",
+    "properties": {
+        "q": {"type": "string", "description": "検索クエリ"},
+        "only_title": {
+            "type": "integer",
+            "default": 0,
+            "description": "タイトルのみを検索するかどうか (0: 全文検索, 1: タイトルのみ)",
+        },
+        "include_archived": {
+            "type": "integer",
+            "default": 0,
+            "description": "アーカイブされたページを含めるかどうか (0: 含めない, 1: 含める)",
+        },
+        "note_code": {"type": ["string", "null"], "description": "ノートコードによるフィルタリング"},
+        "tag_name": {"type": ["string", "null"], "description": "タグ名によるフィルタリング"},
+        "created": {"type": ["string", "null"], "description": "作成日によるフィルタリング"},
+        "page": {"type": "integer", "default": 1, "description": "ページ番号"},
+        "per_page": {"type": "integer", "default": 10, "description": "1ページあたりの結果数"},
+    },
+    "required": ["q"],
+    "additionalProperties": False,
+}
+_DETAIL_SCHEMA = {
+    "type": "object",
+    "properties": {
+        "page_code": {"type": "string", "minLength": 1, "description": "ページコード"},
+    },
+    "required": ["page_code"],
+    "additionalProperties": False,
+}
+_DETAILS_BATCH_SCHEMA = {
+    "type": "object",
+    "properties": {
+        "page_codes": {
+            "type": "array",
+            "items": {"type": "string"},
+            "minItems": 1,
+            "maxItems": _BATCH_MAX_PAGES,
+            "description": "ページコードのリスト",
+        },
+    },
+    "required": ["page_codes"],
+    "additionalProperties": False,
+}
+
+
+def _get_retry_wait(response: httpx.Response, attempt: int) -> float:
+    """リトライまでの待機秒数を求めます
+
+    Retry-Afterヘッダー、またはレート制限の残り回数が0の場合はX-RateLimit-Resetヘッダーを優先し、
+    どちらもない場合はジッター付きの指数バックオフを使用します。
 
-        Returns:
-            str: 検索結果のJSON文字列
+    Args:
+        response (httpx.Response): リトライ対象のレスポンス
+        attempt (int): これまでのリトライ回数
 
-        Raises:
-            ValueError: APIリクエストが失敗した場合
-        """
-        headers = {"Authorization": f"Bearer {self.config.api_token}"}
-        response = await self._client.get(
-            self.config.api_base,
-            params=params.dict(exclude_none=True),  # Noneの値を除外してパラメータを構築
-            headers=headers,
-        )
+    Returns:
+        float: 待機秒数
+    """
+    retry_after = response.headers.get("Retry-After")
+    if retry_after is not None:
+        try:
+            seconds = float(retry_after)
+        except ValueError:
+            try:
+                retry_at = parsedate_to_datetime(retry_after)
+            except (TypeError, ValueError):
+                pass
+            else:
+                # タイムゾーンのない日時はローカル時刻ではなくUTCとして扱う
+                if retry_at.tzinfo is None:
+                    retry_at = retry_at.replace(tzinfo=timezone.utc)
+                return max(retry_at.timestamp() - time.time(), 0.0)
+        else:
+            # nanやinfは解釈できない値として扱い、指数バックオフにフォールバックする
+            if math.isfinite(seconds):
+                return max(seconds, 0.0)
+
+    reset = response.headers.get("X-RateLimit-Reset")
+    if response.headers.get("X-RateLimit-Remaining") == "0" and reset is not None:
+        try:
+            wait = float(reset)
+        except ValueError:
+            pass
+        else:
+            # nanやinfは解釈できない値として扱い、指数バックオフにフォールバックする
+            if math.isfinite(wait):
+                # UNIX時刻で返される場合は現在時刻との差を待機時間とする
+                # 時刻のずれなどでリセット時刻を過ぎている場合は待機しない
+                if wait >= _RATE_LIMIT_RESET_EPOCH_THRESHOLD:
+                    wait -= time.time()
+                return max(wait, 0.0)
+
+    return _RETRY_BACKOFF_BASE * 2**attempt + random.uniform(0, _RETRY_JITTER)
+
+
+async def _request_with_retry(
+    client: httpx.AsyncClient, method: str, url: str, **kwargs
+) -> httpx.Response:
+    """レート制限や一時的なエラーの場合にリトライしながらリクエストを送信します
+
+    待機時間の合計が上限を超える場合はリトライせず、最後に受信したレスポンスを返します。
+
+    Args:
+        client (httpx.AsyncClient): 共有するHTTPクライアント
+        method (str): HTTPメソッド
+        url (str): リクエスト先のURL
+        **kwargs: httpx.AsyncClient.requestに渡す追加の引数
 
-        if response.status_code != 200:
-            raise ValueError(
-                f"NotePM APIからのデータ取得に失敗しました: {response.status_code} {response.text}"
+    Returns:
+        httpx.Response: 最後に受信したレスポンス
+    """
+    attempt = 0
+    waited = 0.0
+    while True:
+        response = await client.request(method, url, **kwargs)
+        if response.status_code not in _RETRY_STATUS_CODES or attempt >= _MAX_RETRIES:
+            return response
+
+        wait = _get_retry_wait(response, attempt)
+        if waited + wait > _RETRY_BUDGET:
+            logger.info(
+                "NotePM APIが%dを返しましたが、待機時間%.2f秒がリトライの上限を超えるためリトライしません",
+                response.status_code,
+                wait,
             )
+            return response
+
+        waited += wait
+        attempt += 1
+        logger.info(
+            "NotePM APIが%dを返したため%.2f秒後にリトライします (%d/%d)",
+            response.status_code,
+            wait,
+            attempt,
+            _MAX_RETRIES,
+        )
+        await asyncio.sleep(wait)
+
+
+async def search(
+    client: httpx.AsyncClient, config: NotePMConfig, params: SearchParams
+) -> bytes:
+    """NotePMの検索APIを呼び出します
+
+    Args:
+        client (httpx.AsyncClient): 共有するHTTPクライアント（認証ヘッダー設定済み）
+        config (NotePMConfig): API設定
+        params (SearchParams): 検索パラメータ
+
+    Returns:
+        bytes: 検索結果のUTF-8エンコードされたJSON
 
+    Raises:
+        ValueError: APIリクエストが失敗した場合
+    """
+    response = await _request_with_retry(
+        client,
+        "GET",
+        config.api_base,
+        params=params.model_dump(exclude_none=True),  # Noneの値を除外してパラメータを構築
+    )
+
+    if response.status_code != 200:
+        raise ValueError(
+            f"NotePM APIからのデータ取得に失敗しました: {response.status_code} {response.text}"
+        )
+
+    # 省略しない設定の場合や、レスポンス全体のバイト数が最大文字数以下で
+    # どの本文も省略対象にならない場合は、パースと再シリアライズを行わずにそのまま返す
+    if not config.truncates_body or len(response.content) <= config.max_body_length:
+        return response.content
+
+    try:
+        data = orjson.loads(response.content)
+        # レスポンスの本文部分を設定された文字数で制限
+        _truncate_body_content(data, config.max_body_length)
+    except orjson.JSONDecodeError as e:
+        raise ValueError(f"Invalid JSON response: {e}")
+    # オプションを指定しないorjson.dumpsはASCIIエスケープなしのUTF-8を出力する
+    return orjson.dumps(data)
+
+
+async def get_notepm_page_detail(
+    client: httpx.AsyncClient, config: NotePMConfig, params: NotePMDetailParams
+) -> bytes:
+    """NotePMの詳細取得APIを呼び出します
+
+    Args:
+        client (httpx.AsyncClient): 共有するHTTPクライアント（認証ヘッダーとbase_url設定済み）
+        config (NotePMConfig): API設定
+        params (NotePMDetailParams): 詳細取得パラメータ
+
+    Returns:
+        bytes: 詳細取得結果のUTF-8エンコードされたJSON
+
+    Raises:
+        ValueError: APIリクエストが失敗した場合
+    """
+    use_cache = config.page_cache_ttl > 0
+    cached = _page_detail_cache.get(params.page_code) if use_cache else None
+
+    # キャッシュの有効期限内であればAPIを呼び出さない
+    if cached is not None and time.monotonic() - cached.fetched_at < config.page_cache_ttl:
+        return cached.content
+
+    # 有効期限切れのキャッシュにETagがあれば、条件付きリクエストで再検証する
+    headers = None
+    if cached is not None and cached.etag is not None:
+        headers = {"If-None-Match": cached.etag}
+
+    # ページコードはクライアントのbase_urlからの相対パスとして解決される
+    # 入力がURLとして解釈されて認証ヘッダーが別ホストへ送られないよう、一つのパスセグメントとしてエンコードする
+    path = quote(params.page_code, safe="")
+    response = await _request_with_retry(client, "GET", path, headers=headers)
+
+    if response.status_code == 304 and cached is not None:
+        _page_detail_cache[params.page_code] = cached._replace(fetched_at=time.monotonic())
+        return cached.content
+
+    if response.status_code != 200:
+        raise ValueError(
+            f"NotePM APIからのデータ取得に失敗しました: {response.status_code} {response.text}"
+        )
+
+    # 詳細表示では本文を省略しないため、パースと再シリアライズを行わずにそのまま返す
+    # JSONの妥当性はデバッグログが有効な場合のみ検証する
+    if logger.isEnabledFor(logging.DEBUG):
         try:
-            data = json.loads(response.text)
-            # レスポンスの本文部分を設定された文字数で制限
-            self._truncate_body_content(data, self.config.max_body_length)
-        except json.JSONDecodeError as e:
+            orjson.loads(response.content)
+        except orjson.JSONDecodeError as e:
             raise ValueError(f"Invalid JSON response: {e}")
-        return json.dumps(data, ensure_ascii=False)
 
-    async def get_notepm_page_detail(self, params: NotePMDetailParams) -> str:
-        """NotePMの詳細取得APIを呼び出します
+    if use_cache:
+        _page_detail_cache[params.page_code] = _CachedPage(
+            fetched_at=time.monotonic(),
+            etag=response.headers.get("ETag"),
+            content=response.content,
+        )
+    return response.content
 
-        Args:
-            params (NotePMDetailParams): 詳細取得パラメータ
 
-        Returns:
-            str: 詳細取得結果のJSON文字列
+async def get_notepm_page_details(
+    client: httpx.AsyncClient, config: NotePMConfig, params: NotePMDetailsBatchParams
+) -> list[bytes]:
+    """複数ページの詳細取得APIを並行して呼び出します
 
-        Raises:
-            ValueError: APIリクエストが失敗した場合
-        """
-        headers = {"Authorization": f"Bearer {self.config.api_token}"}
-        url = f"{self.config.api_base}/{params.page_code}"
-        response = await self._client.get(url, headers=headers)
+    共有HTTPクライアントの接続を使い、同時リクエスト数を制限しながら取得します。
 
-        if response.status_code != 200:
-            raise ValueError(
-                f"NotePM APIからのデータ取得に失敗しました: {response.status_code} {response.text}"
+    Args:
+        client (httpx.AsyncClient): 共有するHTTPクライアント（認証ヘッダーとbase_url設定済み）
+        config (NotePMConfig): API設定
+        params (NotePMDetailsBatchParams): 一括詳細取得パラメータ
+
+    Returns:
+        list[bytes]: ページコードの順に並んだ詳細取得結果のUTF-8エンコードされたJSONのリスト
+            取得に失敗したページは、ページコードとエラー内容を持つJSONになります
+    """
+    semaphore = asyncio.Semaphore(_BATCH_CONCURRENCY)
+
+    async def fetch(page_code: str) -> bytes:
+        async with semaphore:
+            return await get_notepm_page_detail(
+                client, config, NotePMDetailParams(page_code=page_code)
             )
 
-        try:
-            data = json.loads(response.text)
-            # 詳細表示では本文を省略しない
-            return json.dumps(data, ensure_ascii=False)
-        except json.JSONDecodeError as e:
-            raise ValueError(f"Invalid JSON response: {e}")
+    # 一部のページの失敗で取得済みの結果を捨てないよう、例外もページごとの結果として受け取る
+    results = await asyncio.gather(
+        *(fetch(page_code) for page_code in params.page_codes), return_exceptions=True
+    )
 
-    def _truncate_body_content(self, data: dict, max_length: int = 1000) -> None:
-        """レスポンスデータの本文部分を指定された文字数で省略します
+    contents: list[bytes] = []
+    for page_code, result in zip(params.page_codes, results):
+        if isinstance(result, Exception):
+            contents.append(orjson.dumps({"page_code": page_code, "error": str(result)}))
+        elif isinstance(result, BaseException):
+            raise result
+        else:
+            contents.append(result)
+    return contents
 
-        Args:
-            data (dict): NotePM APIのレスポンスデータ
-            max_length (int): 本文の最大文字数 (デフォルト: 1000)
-        """
 
-        if isinstance(data, dict):
-            # 検索結果の場合（pagesフィールドが存在する場合）
-            if "pages" in data and isinstance(data["pages"], list):
-                for page in data["pages"]:
-                    if isinstance(page, dict) and "body" in page:
-                        original_body = page["body"]
+def _truncate_body_content(data: dict, max_length: int = 1000) -> None:
+    """レスポンスデータの本文部分を指定された文字数で省略します
 
-                        if (
-                            isinstance(original_body, str)
-                            and len(original_body) > max_length
-                        ):
-                            page["body"] = original_body[:max_length] + "..."
+    Args:
+        data (dict): NotePM APIのレスポンスデータ
+        max_length (int): 本文の最大文字数 (デフォルト: 1000)
+    """
+    if not isinstance(data, dict):
+        return
+
+    # 検索結果の場合（pagesフィールドが存在する場合）
+    pages = data.get("pages")
+    if pages is not None:
+        for page in pages:
+            # NotePM APIの本文は文字列またはnullのみ
+            body = page.get("body")
+            if body is not None and len(body) > max_length:
+                page["body"] = body[:max_length] + _TRUNCATION_SUFFIX
+        return
+
+    # 詳細取得結果の場合（pageフィールドが存在する場合）
+    page = data.get("page")
+    if page is not None:
+        body = page.get("body")
+        if body is not None and len(body) > max_length:
+            page["body"] = body[:max_length] + _TRUNCATION_SUFFIX
+
+
+def create_http_client(config: NotePMConfig) -> httpx.AsyncClient:
+    """NotePM APIとの通信に使用する共有HTTPクライアントを生成します
+
+    ツール呼び出しごとにクライアントを生成するとTCP/TLS接続を再利用できないため、
+    サーバーの起動中は一つのクライアントを使い回します。
+    HTTP/2で同時リクエストを一つの接続に多重化し、レスポンスはgzip/brotliで圧縮させます。
+    接続の確立に失敗した場合はトランスポート層でリトライします。
 
-            # 詳細取得結果の場合（pageフィールドが存在する場合）
-            elif "page" in data and isinstance(data["page"], dict):
-                page = data["page"]
-                if "body" in page:
-                    original_body = page["body"]
+    Args:
+        config (NotePMConfig): API設定
 
-                    if (
-                        isinstance(original_body, str)
-                        and len(original_body) > max_length
-                    ):
-                        page["body"] = original_body[:max_length] + "..."
+    Returns:
+        httpx.AsyncClient: 認証ヘッダーとコネクションプールを設定したHTTPクライアント
+    """
+    # トランスポートを指定するとクライアント側のhttp2とlimitsは無視されるため、トランスポートに設定する
+    transport = httpx.AsyncHTTPTransport(
+        http2=True,
+        limits=httpx.Limits(
+            max_keepalive_connections=20,
+            max_connections=100,
+            keepalive_expiry=30.0,
+        ),
+        retries=_MAX_RETRIES,
+    )
+    return httpx.AsyncClient(
+        base_url=f"{config.api_base}/",
+        transport=transport,
+        headers={**config.auth_header, "Accept-Encoding": "gzip, br"},
+        timeout=httpx.Timeout(30.0),
+    )
 
 
 def get_tool_description(env_var_name: str, default_description: str) -> str:
@@ -209,6 +519,7 @@ async def serve() -> None:
     """
     config = NotePMConfig()
     server: Server = Server("notepm-mcp")
+    http_client = create_http_client(config)
 
     # ツールの説明文のデフォルト値
     default_search_description = """
@@ -221,21 +532,39 @@ async def serve() -> None:
     
     default_detail_description = "NotePM(ノートPM)で指定されたページコードの記事に対して詳細な内容を取得します。"
 
+    default_details_batch_description = """
+                    NotePM(ノートPM)で指定された複数のページコードの記事に対して詳細な内容を並行して取得します。
+                    一度に指定できるページコードは最大50件です。
+                    結果はページコードの順に、記事ごとのJSON形式で返されます。
+                    取得に失敗した記事は、page_codeとerrorを持つJSONとして返されます。
+                    複数の記事の全文が必要な場合は、notepm_page_detailを繰り返し呼び出す代わりに使用してください。
+                """
+
+    # ツールの内容は実行中に変わらないため、起動時に一度だけ生成する
+    tools = [
+        Tool(
+            name="notepm_search",
+            description=get_tool_description("NOTEPM_SEARCH_DESCRIPTION", default_search_description),
+            inputSchema=_SEARCH_SCHEMA,
+        ),
+        Tool(
+            name="notepm_page_detail",
+            description=get_tool_description("NOTEPM_PAGE_DETAIL_DESCRIPTION", default_detail_description),
+            inputSchema=_DETAIL_SCHEMA,
+        ),
+        Tool(
+            name="notepm_page_details_batch",
+            description=get_tool_description(
+                "NOTEPM_PAGE_DETAILS_BATCH_DESCRIPTION", default_details_batch_description
+            ),
+            inputSchema=_DETAILS_BATCH_SCHEMA,
+        ),
+    ]
+
     @server.list_tools()
     async def list_tools() -> list[Tool]:
         """利用可能なツールのリストを返します"""
-        return [
-            Tool(
-                name="notepm_search",
-                description=get_tool_description("NOTEPM_SEARCH_DESCRIPTION", default_search_description),
-                inputSchema=SearchParams.schema(),
-            ),
-            Tool(
-                name="notepm_page_detail",
-                description=get_tool_description("NOTEPM_PAGE_DETAIL_DESCRIPTION", default_detail_description),
-                inputSchema=NotePMDetailParams.schema(),
-            ),
-        ]
+        return tools
 
     @server.call_tool()
     async def call_tool(name: str, arguments: dict) -> list[TextContent]:
@@ -251,21 +580,24 @@ async def serve() -> None:
         Raises:
             ValueError: 不明なツールが指定された場合
         """
+        # APIの結果はUTF-8のバイト列のため、TextContentに渡す直前に一度だけデコードする
         if name == "notepm_search":
             search_params: SearchParams = SearchParams(**arguments)
-            async with NotePMAPIClient(config) as client:
-                result = await client.search(search_params)
-                return [TextContent(type="text", text=result)]
+            result = await search(http_client, config, search_params)
+            return [TextContent(type="text", text=result.decode("utf-8"))]
         elif name == "notepm_page_detail":
             detail_params: NotePMDetailParams = NotePMDetailParams(**arguments)
-            async with NotePMAPIClient(config) as client:
-                result = await client.get_notepm_page_detail(detail_params)
-                return [TextContent(type="text", text=result)]
+            result = await get_notepm_page_detail(http_client, config, detail_params)
+            return [TextContent(type="text", text=result.decode("utf-8"))]
+        elif name == "notepm_page_details_batch":
+            batch_params: NotePMDetailsBatchParams = NotePMDetailsBatchParams(**arguments)
+            results = await get_notepm_page_details(http_client, config, batch_params)
+            return [TextContent(type="text", text=result.decode("utf-8")) for result in results]
 
         raise ValueError(f"不明なツールです: {name}")
 
     # サーバーの初期化オプションを作成
     options = server.create_initialization_options()
-    # 標準入出力を使用してサーバーを起動
-    async with stdio_server() as (read_stream, write_stream):
+    # 標準入出力を使用してサーバーを起動し、終了時に共有HTTPクライアントを閉じる
+    async with http_client, stdio_server() as (read_stream, write_stream):
         await server.run(read_stream, write_stream, options, raise_exceptions=True)